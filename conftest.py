@@ -0,0 +1,2 @@
+# Makes the repository root importable so tests can use `src.` imports,
+# matching PYTHONPATH=/app in Dockerfile.api.
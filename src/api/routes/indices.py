@@ -1,4 +1,6 @@
 from flask import Blueprint, request, jsonify
+from src.indexer.processors.search_indexer import SearchIndexer
+from src.indexer.processors.search_cache import search_cache
 
 bp = Blueprint('indices', __name__, url_prefix='/api')
 
@@ -17,9 +19,94 @@ def get_index(index_id):
 def update_index(index_id):
     data = request.json
     # Logic to update an index using index_id and data
+    try:
+        search_cache.invalidate(index_id)
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'message': 'Index updated but cached search results could not be invalidated',
+            'index_id': index_id
+        }), 500
     return jsonify({"message": "Index updated", "index_id": index_id, "data": data}), 200
 
 @bp.route('/indices/<index_id>', methods=['DELETE'])
 def delete_index(index_id):
     # Logic to delete an index by index_id
-    return jsonify({"message": "Index deleted", "index_id": index_id}), 200
\ No newline at end of file
+    try:
+        search_cache.invalidate(index_id)
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'message': 'Index deleted but cached search results could not be invalidated',
+            'index_id': index_id
+        }), 500
+    return jsonify({"message": "Index deleted", "index_id": index_id}), 200
+
+@bp.route('/indices/<index_id>/search', methods=['GET', 'POST'])
+def search_index(index_id):
+    """Search an index, serving repeated queries from the result cache"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        if data is None and request.get_data():
+            return jsonify({
+                'error': 'Invalid request body',
+                'message': 'Request body must be valid JSON'
+            }), 400
+        if data is None:
+            data = {}
+        if not isinstance(data, dict):
+            return jsonify({
+                'error': 'Invalid request body',
+                'message': 'Request body must be a JSON object'
+            }), 400
+        query = data.get('query', '')
+        filters = data.get('filters') or {}
+    else:
+        query = request.args.get('q', '')
+        # Keep every value of repeated keys; a single value stays a scalar
+        filters = {
+            k: v[0] if len(v) == 1 else sorted(v)
+            for k, v in request.args.to_dict(flat=False).items() if k != 'q'
+        }
+
+    if not isinstance(query, str):
+        return jsonify({
+            'error': 'Invalid query value',
+            'message': 'query must be a string'
+        }), 400
+
+    if not isinstance(filters, dict):
+        return jsonify({
+            'error': 'Invalid filters value',
+            'message': 'filters must be an object'
+        }), 400
+
+    # Capture the generation before querying so results fetched while the
+    # index is being written to are stored under an outdated key. If the
+    # shared generation store is unreachable, bypass the cache entirely.
+    try:
+        cache_key = search_cache.make_key(index_id, query, filters, search_cache.generation(index_id))
+    except Exception:
+        cache_key = None
+    results = search_cache.get(cache_key) if cache_key is not None else None
+    cached = results is not None
+
+    if not cached:
+        try:
+            results = SearchIndexer(index_id).search(search_cache.normalize_query(query), filters or None)
+        except Exception as e:
+            return jsonify({
+                'error': str(e),
+                'message': 'Failed to search index'
+            }), 500
+        if cache_key is not None:
+            search_cache.set(cache_key, results)
+
+    return jsonify({
+        'index_id': index_id,
+        'query': query,
+        'filters': filters,
+        'results': results,
+        'total': len(results),
+        'cached': cached
+    }), 200
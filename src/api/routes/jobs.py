@@ -148,6 +148,19 @@ def create_job():
                 )
             )
         
+        # Indexer writes must advance the same search generations the API reads
+        env_vars.append(
+            client.V1EnvVar(
+                name="SEARCH_GENERATION_CONTAINER",
+                value=os.getenv('SEARCH_GENERATION_CONTAINER', 'search-generations')
+            )
+        )
+        
+        # Near-duplicate detection store shared by every indexer pod and run
+        for env_name in ['DEDUP_CONTAINER', 'DEDUP_THRESHOLD']:
+            if os.getenv(env_name):
+                env_vars.append(client.V1EnvVar(name=env_name, value=os.getenv(env_name)))
+        
         # Add custom environment variables
         for k, v in job_env.items():
             env_vars.append(client.V1EnvVar(name=k, value=str(v)))
@@ -1,6 +1,14 @@
+from processors.deduplicator import create_deduplicator
+from processors.search_indexer import SearchIndexer
+
 class IndexerJob:
     def __init__(self):
         self.jobs = []
+        # Shared by every indexer the job builds; None when DEDUP_STORE_PATH is unset
+        self.deduplicator = create_deduplicator()
+
+    def get_indexer(self, index_name):
+        return SearchIndexer(index_name, deduplicator=self.deduplicator)
 
     def schedule_job(self, job):
         self.jobs.append(job)
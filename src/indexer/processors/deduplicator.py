@@ -0,0 +1,415 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"\w+")
+_SHINGLE_CHUNK = 4096
+
+BandKey = Tuple[int, bytes]
+
+
+class SQLiteSignatureStore:
+    """
+    Signature store in a SQLite file, for local development and tests.
+
+    Writes run in IMMEDIATE transactions, so several processes may share the
+    file on a local disk. Do not place it on a network filesystem.
+    """
+
+    def __init__(self, path: str):
+        store_dir = os.path.dirname(path)
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "index_name TEXT NOT NULL, doc_id TEXT NOT NULL, canonical_id TEXT NOT NULL, "
+            "content_hash TEXT NOT NULL, signature BLOB, PRIMARY KEY (index_name, doc_id))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS documents_canonical ON documents (index_name, canonical_id)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bands ("
+            "index_name TEXT NOT NULL, band INTEGER NOT NULL, band_key BLOB NOT NULL, doc_id TEXT NOT NULL, "
+            "PRIMARY KEY (index_name, band, band_key, doc_id))"
+        )
+
+    @contextmanager
+    def lock(self, index_name: str):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def get(self, index_name: str, doc_id: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT canonical_id, content_hash FROM documents WHERE index_name = ? AND doc_id = ?",
+                (index_name, doc_id)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def candidates(self, index_name: str, band_keys: List[BandKey]) -> Dict[str, bytes]:
+        candidates = {}
+        with self._lock:
+            for band, key in band_keys:
+                rows = self._conn.execute(
+                    "SELECT d.doc_id, d.signature FROM bands b JOIN documents d "
+                    "ON d.index_name = b.index_name AND d.doc_id = b.doc_id "
+                    "WHERE b.index_name = ? AND b.band = ? AND b.band_key = ?",
+                    (index_name, band, key)
+                )
+                candidates.update(rows)
+        return candidates
+
+    def add_canonical(self, index_name: str, doc_id: str, content_hash: str,
+                      signature: bytes, band_keys: List[BandKey]) -> None:
+        self._conn.execute(
+            "INSERT INTO documents (index_name, doc_id, canonical_id, content_hash, signature) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (index_name, doc_id, doc_id, content_hash, signature)
+        )
+        self._conn.executemany(
+            "INSERT INTO bands (index_name, band, band_key, doc_id) VALUES (?, ?, ?, ?)",
+            [(index_name, band, key, doc_id) for band, key in band_keys]
+        )
+
+    def add_duplicate(self, index_name: str, doc_id: str, canonical_id: str, content_hash: str) -> None:
+        self._conn.execute(
+            "INSERT INTO documents (index_name, doc_id, canonical_id, content_hash, signature) "
+            "VALUES (?, ?, ?, ?, NULL)",
+            (index_name, doc_id, canonical_id, content_hash)
+        )
+
+    def detach(self, index_name: str, doc_id: str) -> List[str]:
+        duplicates = [row[0] for row in self._conn.execute(
+            "SELECT doc_id FROM documents WHERE index_name = ? AND canonical_id = ? AND doc_id != ?",
+            (index_name, doc_id, doc_id)
+        )]
+        self._conn.execute("DELETE FROM bands WHERE index_name = ? AND doc_id = ?", (index_name, doc_id))
+        self._conn.execute(
+            "DELETE FROM documents WHERE index_name = ? AND (doc_id = ? OR canonical_id = ?)",
+            (index_name, doc_id, doc_id)
+        )
+        return duplicates
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class BlobSignatureStore:
+    """
+    Signature store in Azure Blob Storage, shared by every indexer pod.
+
+    Each document is a JSON blob and each LSH band entry an empty marker
+    blob named after the band hash, with the signature in its metadata, so
+    candidates are found by listing a prefix. Checks of one index are
+    serialized across pods by a lease on a per-index lock blob.
+    """
+
+    def __init__(self, connection_string: str, container_name: str,
+                 lease_seconds: int = 60, lock_timeout: float = 120, max_workers: int = 16):
+        service = BlobServiceClient.from_connection_string(connection_string)
+        self._container = service.get_container_client(container_name)
+        self._lease_seconds = lease_seconds
+        self._lock_timeout = lock_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    @staticmethod
+    def _prefix(index_name: str) -> str:
+        return quote(index_name, safe="")
+
+    def _document_name(self, index_name: str, doc_id: str) -> str:
+        return f"{self._prefix(index_name)}/documents/{quote(doc_id, safe='')}"
+
+    def _band_prefix(self, index_name: str, band: int, key: bytes) -> str:
+        return f"{self._prefix(index_name)}/bands/{band}/{key.hex()}/"
+
+    def _duplicate_prefix(self, index_name: str, canonical_id: str) -> str:
+        return f"{self._prefix(index_name)}/duplicates/{quote(canonical_id, safe='')}/"
+
+    def _ensure_container(self) -> None:
+        try:
+            self._container.create_container()
+        except ResourceExistsError:
+            pass
+
+    def _upload(self, name: str, data, metadata: Optional[Dict] = None, overwrite: bool = True) -> None:
+        try:
+            self._container.upload_blob(name, data, overwrite=overwrite, metadata=metadata)
+        except ResourceNotFoundError:
+            self._ensure_container()
+            self._container.upload_blob(name, data, overwrite=overwrite, metadata=metadata)
+
+    def _delete(self, name: str) -> None:
+        try:
+            self._container.delete_blob(name)
+        except ResourceNotFoundError:
+            pass
+
+    @contextmanager
+    def lock(self, index_name: str):
+        blob = self._container.get_blob_client(f"{self._prefix(index_name)}/lock")
+        deadline = time.monotonic() + self._lock_timeout
+        while True:
+            try:
+                lease = blob.acquire_lease(lease_duration=self._lease_seconds)
+                break
+            except ResourceNotFoundError:
+                try:
+                    self._upload(blob.blob_name, b"", overwrite=False)
+                except HttpResponseError as e:
+                    # Created (and possibly leased) by another pod in the meantime
+                    if e.status_code not in (409, 412):
+                        raise
+            except HttpResponseError as e:
+                # 409: another pod holds the lease
+                if e.status_code != 409 or time.monotonic() > deadline:
+                    raise
+                time.sleep(random.uniform(0.05, 0.25))
+        try:
+            yield
+        finally:
+            lease.release()
+
+    def _read_document(self, index_name: str, doc_id: str) -> Optional[Dict]:
+        try:
+            return json.loads(self._container.download_blob(self._document_name(index_name, doc_id)).readall())
+        except ResourceNotFoundError:
+            return None
+
+    def get(self, index_name: str, doc_id: str) -> Optional[Tuple[str, str]]:
+        document = self._read_document(index_name, doc_id)
+        return (document["canonical_id"], document["content_hash"]) if document else None
+
+    def candidates(self, index_name: str, band_keys: List[BandKey]) -> Dict[str, bytes]:
+        def list_band(band_key):
+            prefix = self._band_prefix(index_name, *band_key)
+            return [(unquote(blob.name[len(prefix):]), bytes.fromhex(blob.metadata["signature"]))
+                    for blob in self._container.list_blobs(name_starts_with=prefix, include=["metadata"])]
+
+        candidates = {}
+        for entries in self._executor.map(list_band, band_keys):
+            candidates.update(entries)
+        return candidates
+
+    def add_canonical(self, index_name: str, doc_id: str, content_hash: str,
+                      signature: bytes, band_keys: List[BandKey]) -> None:
+        # The document blob is written first so detach() can always find its bands
+        self._upload(self._document_name(index_name, doc_id), json.dumps({
+            "canonical_id": doc_id,
+            "content_hash": content_hash,
+            "bands": [[band, key.hex()] for band, key in band_keys],
+        }))
+        marker = quote(doc_id, safe="")
+        metadata = {"signature": signature.hex()}
+        list(self._executor.map(
+            lambda band_key: self._upload(self._band_prefix(index_name, *band_key) + marker, b"", metadata),
+            band_keys
+        ))
+
+    def add_duplicate(self, index_name: str, doc_id: str, canonical_id: str, content_hash: str) -> None:
+        self._upload(self._document_name(index_name, doc_id), json.dumps({
+            "canonical_id": canonical_id,
+            "content_hash": content_hash,
+            "bands": [],
+        }))
+        self._upload(self._duplicate_prefix(index_name, canonical_id) + quote(doc_id, safe=""), b"")
+
+    def detach(self, index_name: str, doc_id: str) -> List[str]:
+        document = self._read_document(index_name, doc_id)
+        if document is None:
+            return []
+        marker = quote(doc_id, safe="")
+        names = [self._band_prefix(index_name, band, bytes.fromhex(key)) + marker
+                 for band, key in document["bands"]]
+        if document["canonical_id"] != doc_id:
+            names.append(self._duplicate_prefix(index_name, document["canonical_id"]) + marker)
+
+        prefix = self._duplicate_prefix(index_name, doc_id)
+        duplicates = []
+        for blob in self._container.list_blobs(name_starts_with=prefix):
+            duplicates.append(unquote(blob.name[len(prefix):]))
+            names.append(blob.name)
+        names.extend(self._document_name(index_name, duplicate) for duplicate in duplicates)
+
+        list(self._executor.map(self._delete, names))
+        self._delete(self._document_name(index_name, doc_id))
+        return duplicates
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+
+class DocumentDeduplicator:
+    """
+    Near-duplicate detection with MinHash signatures and an LSH index.
+
+    Signatures (one 4-byte value per permutation) and LSH bands are kept in
+    a shared store, scoped by index, and candidates are queried from it on
+    every check, so duplicates are recognised across runs and across the
+    parallel pods of a job. Near-duplicates are recorded against the
+    canonical document id instead of being embedded and indexed again.
+    """
+
+    def __init__(self, store, num_perm: int = 128, bands: int = 16,
+                 threshold: float = 0.8, shingle_size: int = 5, min_shingles: int = 5,
+                 seed: int = 1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.store = store
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+
+        # 32-bit coefficients and shingle hashes keep a * s + b within uint64
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.lower())
+        if len(words) < self.shingle_size:
+            grams = [" ".join(words)] if words else []
+        else:
+            grams = [" ".join(words[i:i + self.shingle_size])
+                     for i in range(len(words) - self.shingle_size + 1)]
+        hashes = {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little")
+                  for g in grams}
+        return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        Compute the MinHash signature of a text, or None if it has too few
+        shingles to be compared meaningfully.
+        """
+        shingles = self._shingles(text)
+        if len(shingles) < max(self.min_shingles, 1):
+            return None
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(shingles), _SHINGLE_CHUNK):
+            chunk = shingles[start:start + _SHINGLE_CHUNK]
+            hashed = (self._a[:, None] * chunk[None, :] + self._b[:, None]) % np.uint64(_MERSENNE_PRIME)
+            np.minimum(signature, (hashed & np.uint64(_MAX_HASH)).min(axis=1), out=signature)
+        return signature.astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[BandKey]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    @staticmethod
+    def similarity(left: np.ndarray, right: np.ndarray) -> float:
+        """
+        Estimate the Jaccard similarity of two signatures.
+        """
+        return float(np.count_nonzero(left == right)) / len(left)
+
+    def _find_canonical(self, index_name: str, signature: np.ndarray) -> Optional[str]:
+        best_id, best_score = None, self.threshold
+        for candidate, blob in self.store.candidates(index_name, self._band_keys(signature)).items():
+            candidate_signature = np.frombuffer(blob, dtype=np.uint32)
+            if len(candidate_signature) != self.num_perm:
+                continue
+            score = self.similarity(signature, candidate_signature)
+            if score >= best_score:
+                best_id, best_score = candidate, score
+        return best_id
+
+    def canonical_id(self, index_name: str, doc_id: str) -> Optional[str]:
+        """
+        Return the canonical document id recorded for a document, if any.
+        """
+        record = self.store.get(index_name, doc_id)
+        return record[0] if record else None
+
+    def check(self, index_name: str, doc_id: str, text: str) -> Optional[str]:
+        """
+        Register a document of an index and return the id of its canonical near-duplicate.
+
+        Returns None when the document is new, changed without matching another
+        document, or too short to compare (it should be embedded and indexed),
+        otherwise the canonical document id it maps onto.
+        """
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        record = self.store.get(index_name, doc_id)
+        if record and record[1] == content_hash:
+            return None if record[0] == doc_id else record[0]
+
+        signature = self.signature(text)
+
+        with self.store.lock(index_name):
+            record = self.store.get(index_name, doc_id)
+            if record and record[1] == content_hash:
+                return None if record[0] == doc_id else record[0]
+            if record:
+                # Content changed: forget the old registration and its duplicates
+                self.store.detach(index_name, doc_id)
+            if signature is None:
+                return None
+
+            canonical = self._find_canonical(index_name, signature)
+            if canonical is not None:
+                self.store.add_duplicate(index_name, doc_id, canonical, content_hash)
+            else:
+                self.store.add_canonical(index_name, doc_id, content_hash, signature.tobytes(),
+                                         self._band_keys(signature))
+            return canonical
+
+    def remove(self, index_name: str, doc_id: str) -> List[str]:
+        """
+        Drop a document of an index from the store, e.g. after it is deleted
+        from the index or failed to be written to it.
+
+        Returns the ids of its duplicates, whose mappings were cleared so that
+        they are indexed the next time they are checked.
+        """
+        with self.store.lock(index_name):
+            return self.store.detach(index_name, doc_id)
+
+    def close(self) -> None:
+        self.store.close()
+
+
+def create_deduplicator() -> Optional[DocumentDeduplicator]:
+    """
+    Build a deduplicator from the environment.
+
+    DEDUP_STORE_PATH selects a local SQLite store; otherwise DEDUP_CONTAINER
+    and AZURE_STORAGE_CONNECTION_STRING select the shared blob store. Returns
+    None when neither is configured.
+    """
+    store_path = os.getenv("DEDUP_STORE_PATH")
+    container_name = os.getenv("DEDUP_CONTAINER")
+    connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    if store_path:
+        store = SQLiteSignatureStore(store_path)
+    elif container_name and connection_string:
+        store = BlobSignatureStore(connection_string, container_name)
+    else:
+        return None
+    return DocumentDeduplicator(store, threshold=float(os.getenv("DEDUP_THRESHOLD", "0.8")))
@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient
+from cachetools import TTLCache
+
+
+class BlobGenerationStore:
+    """
+    Per-index generation counters kept in Azure Blob Storage.
+
+    Every API worker and indexer pod reads and advances the same counters,
+    so a write in any process invalidates cached results in all of them.
+    Increments use ETag conditions so concurrent writers never lose an update.
+    The container is created on the first increment that needs it.
+    """
+
+    def __init__(self, connection_string: str, container_name: str, max_retries: int = 10):
+        service = BlobServiceClient.from_connection_string(connection_string)
+        self._container = service.get_container_client(container_name)
+        self._max_retries = max_retries
+
+    def _ensure_container(self) -> None:
+        try:
+            self._container.create_container()
+        except ResourceExistsError:
+            pass
+
+    def get(self, index_id: str) -> int:
+        try:
+            return int(self._container.download_blob(index_id).readall())
+        except ResourceNotFoundError:
+            return 0
+
+    def increment(self, index_id: str) -> int:
+        blob = self._container.get_blob_client(index_id)
+        for _ in range(self._max_retries):
+            try:
+                downloader = blob.download_blob()
+                generation = int(downloader.readall()) + 1
+                blob.upload_blob(str(generation), overwrite=True,
+                                 etag=downloader.properties.etag,
+                                 match_condition=MatchConditions.IfNotModified)
+                return generation
+            except ResourceNotFoundError:
+                try:
+                    blob.upload_blob("1", overwrite=False)
+                    return 1
+                except ResourceExistsError:
+                    continue
+                except ResourceNotFoundError:
+                    self._ensure_container()
+                    continue
+            except ResourceModifiedError:
+                continue
+        raise RuntimeError(f"Could not advance search generation of index {index_id}")
+
+
+class LocalGenerationStore:
+    """
+    In-memory generation counters, for local development and tests.
+
+    Counters are not shared between processes, so writes in one process do
+    not invalidate cached results in another.
+    """
+
+    def __init__(self):
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, index_id: str) -> int:
+        with self._lock:
+            return self._generations.get(index_id, 0)
+
+    def increment(self, index_id: str) -> int:
+        with self._lock:
+            generation = self._generations.get(index_id, 0) + 1
+            self._generations[index_id] = generation
+            return generation
+
+
+class SearchResultCache:
+    """
+    In-process LRU + TTL cache for search results.
+
+    Cache keys include the generation of the index, so advancing it (on any
+    write to the index) makes older entries unreachable; they are then aged
+    out by the LRU/TTL policy.
+
+    Generations are served from memory and re-read from the shared store at
+    most every `poll_interval` seconds per index, so cache hits never wait on
+    the network. Writes in this process are visible immediately; writes in
+    other processes are visible within `poll_interval` seconds.
+    """
+
+    def __init__(self, store_factory: Callable, maxsize: int = 1024, ttl: float = 300,
+                 poll_interval: float = 2):
+        self._results = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._store_factory = store_factory
+        self._store = None
+        self._poll_interval = poll_interval
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def _get_store(self):
+        # Built on first use so importing this module never touches the network
+        with self._lock:
+            if self._store is None:
+                self._store = self._store_factory()
+            return self._store
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """
+        Collapse whitespace so equivalent queries share a cache entry.
+        """
+        return " ".join((query or "").split())
+
+    @staticmethod
+    def normalize_filters(filters: Optional[Dict]) -> str:
+        """
+        Serialize filters in a key-order independent form.
+        """
+        return json.dumps(filters or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+    def _remember(self, index_id: str, generation: int) -> None:
+        with self._lock:
+            known = self._generations.get(index_id)
+            # Never move backwards if a concurrent read returned an older value
+            if known is None or generation >= known[0]:
+                self._generations[index_id] = (generation, time.monotonic())
+
+    def generation(self, index_id: str) -> int:
+        """
+        Return the generation of an index, refreshing it from the shared store
+        when the in-memory value is older than the poll interval.
+        """
+        with self._lock:
+            known = self._generations.get(index_id)
+        if known is not None and time.monotonic() - known[1] < self._poll_interval:
+            return known[0]
+        generation = self._get_store().get(index_id)
+        self._remember(index_id, generation)
+        return generation
+
+    def make_key(self, index_id: str, query: str, filters: Optional[Dict], generation: int) -> Tuple:
+        return (index_id, generation, self.normalize_query(query), self.normalize_filters(filters))
+
+    def get(self, key: Tuple) -> Optional[List[Dict]]:
+        """
+        Return cached results for a key, or None on a miss.
+        """
+        with self._lock:
+            return self._results.get(key)
+
+    def set(self, key: Tuple, results: List[Dict]) -> None:
+        """
+        Store results under a key. A key built from an outdated generation is
+        never looked up again, so results fetched during a write are harmless.
+        """
+        with self._lock:
+            self._results[key] = results
+
+    def invalidate(self, index_id: str) -> int:
+        """
+        Advance the generation of an index so its cached results are never served again.
+        """
+        generation = self._get_store().increment(index_id)
+        self._remember(index_id, generation)
+        return generation
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._generations.clear()
+
+
+def _create_generation_store():
+    connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    if not connection_string:
+        return LocalGenerationStore()
+    return BlobGenerationStore(
+        connection_string,
+        os.getenv("SEARCH_GENERATION_CONTAINER", "search-generations"),
+    )
+
+
+search_cache = SearchResultCache(
+    _create_generation_store,
+    maxsize=int(os.getenv("SEARCH_CACHE_MAXSIZE", "1024")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300")),
+    poll_interval=float(os.getenv("SEARCH_GENERATION_POLL_SECONDS", "2")),
+)
@@ -1,29 +1,75 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from .deduplicator import DocumentDeduplicator
+from .search_cache import search_cache
 
 class SearchIndexer:
-    def __init__(self, index_name: str):
+    def __init__(self, index_name: str, deduplicator: Optional[DocumentDeduplicator] = None):
         self.index_name = index_name
+        self.deduplicator = deduplicator
 
     def index_document(self, document: Dict) -> None:
         """
-        Index a single document.
+        Index a single document, skipping near-duplicates of already indexed documents.
+        """
+        if self._index_document(document):
+            self._invalidate_search_cache()
+
+    def bulk_index_documents(self, documents: List[Dict]) -> None:
+        """
+        Index multiple documents in bulk, invalidating cached search results once per batch.
         """
+        indexed = False
+        try:
+            for document in documents:
+                indexed = self._index_document(document) or indexed
+        finally:
+            if indexed:
+                self._invalidate_search_cache()
+
+    def _index_document(self, document: Dict) -> bool:
+        """
+        Write a document to the index. Returns False if it was skipped as a near-duplicate.
+        """
+        registered = False
+        if self.deduplicator is not None and document.get("id") is not None:
+            canonical_id = self.deduplicator.check(self.index_name, document["id"], document.get("content", ""))
+            if canonical_id is not None:
+                print(f"Skipping document: {document['id']} (near-duplicate of {canonical_id}) in index: {self.index_name}")
+                return False
+            registered = True
+        try:
+            self._write_document(document)
+        except Exception:
+            # Never leave near-copies mapped onto a document that is not in the index
+            if registered:
+                try:
+                    self.deduplicator.remove(self.index_name, document["id"])
+                except Exception as e:
+                    print(f"Failed to roll back dedup record of document: {document['id']} in index: {self.index_name}: {e}")
+            raise
+        return True
+
+    def _write_document(self, document: Dict) -> None:
         # Logic to index the document
         print(f"Indexing document: {document} in index: {self.index_name}")
 
-    def bulk_index_documents(self, documents: List[Dict]) -> None:
+    def _invalidate_search_cache(self) -> None:
         """
-        Index multiple documents in bulk.
+        Advance the search generation of the index. Failures are logged rather
+        than raised so they never abort indexing; cached results then expire by TTL.
         """
-        for document in documents:
-            self.index_document(document)
+        try:
+            search_cache.invalidate(self.index_name)
+        except Exception as e:
+            print(f"Failed to invalidate cached search results for index: {self.index_name}: {e}")
 
-    def search(self, query: str) -> List[Dict]:
+    def search(self, query: str, filters: Optional[Dict] = None) -> List[Dict]:
         """
-        Search for documents in the index.
+        Search for documents in the index, optionally restricted by field filters.
         """
         # Logic to perform search
-        print(f"Searching for query: {query} in index: {self.index_name}")
+        print(f"Searching for query: {query} with filters: {filters} in index: {self.index_name}")
         return []  # Return search results as a list of documents
 
     def delete_document(self, document_id: str) -> None:
@@ -31,4 +77,8 @@ class SearchIndexer:
         Delete a document from the index by its ID.
         """
         # Logic to delete the document
-        print(f"Deleting document with ID: {document_id} from index: {self.index_name}")
\ No newline at end of file
+        print(f"Deleting document with ID: {document_id} from index: {self.index_name}")
+        self._invalidate_search_cache()
+        if self.deduplicator is not None:
+            for duplicate_id in self.deduplicator.remove(self.index_name, document_id):
+                print(f"Document: {duplicate_id} is no longer a duplicate of {document_id} and will be indexed the next time it is processed")
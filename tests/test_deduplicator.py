@@ -0,0 +1,233 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+
+from src.indexer.processors import search_indexer
+from src.indexer.processors.deduplicator import BlobSignatureStore, DocumentDeduplicator, SQLiteSignatureStore
+from src.indexer.processors.search_cache import LocalGenerationStore, SearchResultCache
+from src.indexer.processors.search_indexer import SearchIndexer
+
+_CONNECTION_STRING = "DefaultEndpointsProtocol=https;AccountName=test;AccountKey=dGVzdA==;EndpointSuffix=core.windows.net"
+
+
+def _text(seed, words=1500):
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def _edit(text):
+    words = text.split()
+    words[100] = "amended"
+    return " ".join(words) + " page 2 of 2"
+
+
+class FakeContainer:
+    """In-memory stand-in for an Azure ContainerClient."""
+
+    def __init__(self):
+        self.blobs = {}
+        self.leases = set()
+
+    def create_container(self):
+        pass
+
+    def upload_blob(self, name, data, overwrite=False, metadata=None):
+        if not overwrite and name in self.blobs:
+            raise ResourceExistsError("BlobAlreadyExists")
+        self.blobs[name] = (data.encode() if isinstance(data, str) else data, metadata or {})
+
+    def download_blob(self, name):
+        if name not in self.blobs:
+            raise ResourceNotFoundError("BlobNotFound")
+        return SimpleNamespace(readall=lambda: self.blobs[name][0])
+
+    def delete_blob(self, name):
+        if name not in self.blobs:
+            raise ResourceNotFoundError("BlobNotFound")
+        del self.blobs[name]
+
+    def list_blobs(self, name_starts_with="", include=None):
+        return [SimpleNamespace(name=name, metadata=metadata)
+                for name, (_, metadata) in sorted(self.blobs.items()) if name.startswith(name_starts_with)]
+
+    def get_blob_client(self, name):
+        container = self
+
+        class BlobClient:
+            blob_name = name
+
+            def acquire_lease(self, lease_duration):
+                if name not in container.blobs:
+                    raise ResourceNotFoundError("BlobNotFound")
+                if name in container.leases:
+                    error = ResourceExistsError("LeaseAlreadyPresent")
+                    error.status_code = 409
+                    raise error
+                container.leases.add(name)
+                return SimpleNamespace(release=lambda: container.leases.discard(name))
+
+        return BlobClient()
+
+
+def _blob_store(container, **kwargs):
+    store = BlobSignatureStore(_CONNECTION_STRING, "dedup", **kwargs)
+    store._container = container
+    return store
+
+
+@pytest.fixture(params=["sqlite", "blob"])
+def make_deduplicator(request, tmp_path):
+    """Build deduplicators that share one store, as separate runs or pods would."""
+    container = FakeContainer()
+    stores = []
+
+    def make():
+        if request.param == "sqlite":
+            store = SQLiteSignatureStore(str(tmp_path / "signatures.sqlite"))
+        else:
+            store = _blob_store(container)
+        stores.append(store)
+        return DocumentDeduplicator(store)
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+@pytest.fixture
+def deduplicator(make_deduplicator):
+    return make_deduplicator()
+
+
+def test_signature_similarity_tracks_content(deduplicator):
+    base = deduplicator.signature(_text(1))
+
+    assert deduplicator.similarity(base, deduplicator.signature(_text(1))) == 1.0
+    assert deduplicator.similarity(base, deduplicator.signature(_edit(_text(1)))) >= 0.8
+    assert deduplicator.similarity(base, deduplicator.signature(_text(2))) < 0.2
+
+
+def test_exact_and_edited_copies_map_onto_canonical(deduplicator):
+    assert deduplicator.check("idx", "doc1", _text(1)) is None
+    assert deduplicator.check("idx", "copy", _text(1)) == "doc1"
+    assert deduplicator.check("idx", "edited", _edit(_text(1))) == "doc1"
+    assert deduplicator.canonical_id("idx", "edited") == "doc1"
+
+
+def test_unrelated_text_is_not_a_duplicate(deduplicator):
+    deduplicator.check("idx", "doc1", _text(1))
+
+    assert deduplicator.check("idx", "doc2", _text(2)) is None
+    assert deduplicator.canonical_id("idx", "doc2") == "doc2"
+
+
+@pytest.mark.parametrize("text", ["", "\n\n\n", "one two three"])
+def test_texts_without_enough_shingles_are_never_duplicates(deduplicator, text):
+    assert deduplicator.check("idx", "a", text) is None
+    assert deduplicator.check("idx", "b", text) is None
+    assert deduplicator.canonical_id("idx", "a") is None
+
+
+def test_store_persists_across_instances(make_deduplicator):
+    make_deduplicator().check("idx", "doc1", _text(1))
+
+    assert make_deduplicator().check("idx", "copy", _edit(_text(1))) == "doc1"
+
+
+def test_canonicals_from_other_instances_are_visible_immediately(make_deduplicator):
+    first, second = make_deduplicator(), make_deduplicator()
+    second.check("idx", "other", _text(3))
+
+    first.check("idx", "doc1", _text(1))
+
+    assert second.check("idx", "copy", _text(1)) == "doc1"
+
+
+def test_indices_are_deduplicated_independently(deduplicator):
+    deduplicator.check("index-a", "doc1", _text(1))
+
+    assert deduplicator.check("index-b", "copy", _text(1)) is None
+    assert deduplicator.remove("index-b", "doc1") == []
+    assert deduplicator.check("index-a", "copy", _text(1)) == "doc1"
+
+
+def test_changed_duplicate_is_evaluated_again(deduplicator):
+    deduplicator.check("idx", "doc1", _text(1))
+    deduplicator.check("idx", "copy", _text(1))
+
+    assert deduplicator.check("idx", "copy", _text(2)) is None
+    assert deduplicator.check("idx", "copy", _text(1)) == "doc1"
+
+
+def test_changed_canonical_releases_its_duplicates(deduplicator):
+    deduplicator.check("idx", "doc1", _text(1))
+    deduplicator.check("idx", "copy", _text(1))
+
+    assert deduplicator.check("idx", "doc1", _text(2)) is None
+    assert deduplicator.canonical_id("idx", "copy") is None
+    assert deduplicator.check("idx", "copy", _text(1)) is None
+
+
+def test_remove_releases_duplicates(deduplicator):
+    deduplicator.check("idx", "doc1", _text(1))
+    deduplicator.check("idx", "copy", _text(1))
+
+    assert deduplicator.remove("idx", "doc1") == ["copy"]
+    assert deduplicator.canonical_id("idx", "doc1") is None
+    assert deduplicator.check("idx", "copy", _text(1)) is None
+    assert deduplicator.check("idx", "doc1", _text(1)) == "copy"
+
+
+def test_blob_lock_waits_for_other_pods_and_times_out():
+    container = FakeContainer()
+    store = _blob_store(container, lock_timeout=0.2)
+    with store.lock("idx"):
+        with pytest.raises(ResourceExistsError):
+            with _blob_store(container, lock_timeout=0.2).lock("idx"):
+                pass
+    with _blob_store(container).lock("idx"):
+        pass
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = SearchResultCache(LocalGenerationStore)
+    monkeypatch.setattr(search_indexer, "search_cache", cache)
+    return cache
+
+
+def test_indexer_skips_near_duplicates(cache, deduplicator):
+    indexer = SearchIndexer("idx", deduplicator=deduplicator)
+    indexer.bulk_index_documents([
+        {"id": "doc1", "content": _text(1)},
+        {"id": "copy", "content": _edit(_text(1))},
+    ])
+
+    assert deduplicator.canonical_id("idx", "copy") == "doc1"
+
+
+def test_failed_write_rolls_back_canonical_record(cache, deduplicator, monkeypatch):
+    indexer = SearchIndexer("idx", deduplicator=deduplicator)
+
+    def fail(document):
+        raise IOError("index unavailable")
+
+    monkeypatch.setattr(indexer, "_write_document", fail)
+    with pytest.raises(IOError):
+        indexer.index_document({"id": "doc1", "content": _text(1)})
+
+    assert deduplicator.canonical_id("idx", "doc1") is None
+    assert deduplicator.check("idx", "copy", _text(1)) is None
+
+
+def test_delete_document_releases_duplicates(cache, deduplicator):
+    indexer = SearchIndexer("idx", deduplicator=deduplicator)
+    indexer.index_document({"id": "doc1", "content": _text(1)})
+    indexer.index_document({"id": "copy", "content": _text(1)})
+
+    indexer.delete_document("doc1")
+
+    assert deduplicator.canonical_id("idx", "copy") is None
@@ -0,0 +1,169 @@
+import pytest
+from flask import Flask
+
+from src.api.routes import indices
+from src.indexer.processors import search_indexer
+from src.indexer.processors.search_cache import LocalGenerationStore, SearchResultCache
+from src.indexer.processors.search_indexer import SearchIndexer
+
+
+@pytest.fixture
+def store():
+    return LocalGenerationStore()
+
+
+@pytest.fixture
+def cache(monkeypatch, store):
+    cache = SearchResultCache(lambda: store, poll_interval=60)
+    monkeypatch.setattr(indices, "search_cache", cache)
+    monkeypatch.setattr(search_indexer, "search_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def backend_calls(monkeypatch):
+    calls = []
+
+    def search(self, query, filters=None):
+        calls.append((self.index_name, query, filters))
+        return [{"id": "doc1"}]
+
+    monkeypatch.setattr(SearchIndexer, "search", search)
+    return calls
+
+
+@pytest.fixture
+def client(cache, backend_calls):
+    app = Flask(__name__)
+    app.register_blueprint(indices.bp)
+    return app.test_client()
+
+
+def test_repeated_query_is_served_from_cache(client, backend_calls):
+    first = client.get("/api/indices/idx/search?q=contract")
+    second = client.get("/api/indices/idx/search?q=contract")
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.json["cached"] is False
+    assert second.json["cached"] is True
+    assert second.json["results"] == [{"id": "doc1"}]
+    assert len(backend_calls) == 1
+
+
+def test_normalized_query_and_filters_share_an_entry(client, backend_calls):
+    client.post("/api/indices/idx/search", json={"query": "contract  renewal", "filters": {"a": 1, "b": 2}})
+    response = client.post("/api/indices/idx/search", json={"query": " contract renewal ", "filters": {"b": 2, "a": 1}})
+
+    assert response.json["cached"] is True
+    assert len(backend_calls) == 1
+
+
+def test_repeated_get_filters_keep_every_value(client, backend_calls):
+    response = client.get("/api/indices/idx/search?q=a&cat=y&cat=x")
+
+    assert response.json["filters"] == {"cat": ["x", "y"]}
+    assert client.get("/api/indices/idx/search?q=a&cat=x&cat=y").json["cached"] is True
+    assert client.get("/api/indices/idx/search?q=a&cat=x").json["cached"] is False
+
+
+@pytest.mark.parametrize("method", ["put", "delete"])
+def test_index_writes_invalidate_cached_results(client, backend_calls, method):
+    client.get("/api/indices/idx/search?q=contract")
+    response = getattr(client, method)("/api/indices/idx", json={})
+
+    assert response.status_code == 200
+    assert client.get("/api/indices/idx/search?q=contract").json["cached"] is False
+    assert len(backend_calls) == 2
+
+
+def test_writes_to_other_indices_keep_cached_results(client):
+    client.get("/api/indices/idx/search?q=contract")
+    client.put("/api/indices/other", json={})
+
+    assert client.get("/api/indices/idx/search?q=contract").json["cached"] is True
+
+
+def test_indexer_writes_invalidate_cached_results(client, store):
+    client.get("/api/indices/idx/search?q=contract")
+    SearchIndexer("idx").index_document({"id": "doc2", "content": "text"})
+
+    assert client.get("/api/indices/idx/search?q=contract").json["cached"] is False
+
+
+def test_bulk_indexing_advances_generation_once(cache, store):
+    SearchIndexer("idx").bulk_index_documents([{"id": str(i)} for i in range(5)])
+
+    assert store.get("idx") == 1
+
+
+def test_generation_from_other_process_is_picked_up_after_poll_interval(store):
+    api = SearchResultCache(lambda: store, poll_interval=60)
+    polling = SearchResultCache(lambda: store, poll_interval=0)
+    indexer = SearchResultCache(lambda: store)
+    api.generation("idx")
+    polling.generation("idx")
+
+    indexer.invalidate("idx")
+
+    assert api.generation("idx") == 0
+    assert polling.generation("idx") == 1
+
+
+def test_store_is_created_lazily():
+    created = []
+    cache = SearchResultCache(lambda: created.append(True) or LocalGenerationStore())
+
+    assert created == []
+    cache.generation("idx")
+    assert created == [True]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"data": "{not json", "content_type": "application/json"},
+    {"json": [1]},
+    {"json": {"query": 5}},
+    {"json": {"query": "a", "filters": ["x"]}},
+])
+def test_invalid_search_body_is_rejected(client, backend_calls, kwargs):
+    response = client.post("/api/indices/idx/search", **kwargs)
+
+    assert response.status_code == 400
+    assert "error" in response.json
+    assert backend_calls == []
+
+
+class FailingStore:
+    def get(self, index_id):
+        raise ConnectionError("storage unreachable")
+
+    def increment(self, index_id):
+        raise ConnectionError("storage unreachable")
+
+
+@pytest.fixture
+def failing_cache(monkeypatch):
+    cache = SearchResultCache(FailingStore)
+    monkeypatch.setattr(indices, "search_cache", cache)
+    monkeypatch.setattr(search_indexer, "search_cache", cache)
+    return cache
+
+
+def test_unreachable_store_bypasses_cache(client, failing_cache, backend_calls):
+    client.get("/api/indices/idx/search?q=contract")
+    response = client.get("/api/indices/idx/search?q=contract")
+
+    assert response.status_code == 200
+    assert response.json["cached"] is False
+    assert len(backend_calls) == 2
+
+
+@pytest.mark.parametrize("method", ["put", "delete"])
+def test_failed_invalidation_returns_json_error(client, failing_cache, method):
+    response = getattr(client, method)("/api/indices/idx", json={})
+
+    assert response.status_code == 500
+    assert "could not be invalidated" in response.json["message"]
+
+
+def test_failed_invalidation_does_not_abort_indexing(failing_cache):
+    SearchIndexer("idx").bulk_index_documents([{"id": "1"}, {"id": "2"}])